@@ -38,6 +38,9 @@
 #################################################################################
 
 import argparse
+import copy
+import logging
+import sys
 import yaml
 import os
 from datetime import datetime
@@ -46,38 +49,84 @@ import struct
 import platform
 import cv2
 import socket
+import time
+import threading
+import queue
+from collections import deque
 import numpy as np
 
+# prefer the libyaml based loader, fall back to the pure Python loader if PyYAML is built without it
+try:
+    from yaml import CSafeLoader as YamlLoader
+except ImportError:
+    from yaml import SafeLoader as YamlLoader
 
-# This class is used to log messages with different levels of severity.
-class Logger:
+
+# This class formats log records with the colored "[time] [Level]" layout of the Logger.
+class ColorFormatter(logging.Formatter):
 
     RED = "\033[91m"
     YELLOW = "\033[93m"
     CYAN = "\033[96m"
     RESET = "\033[0m"
 
+    # (color prefix, label, color suffix) for each log level
+    LEVEL_STYLES = {
+        logging.ERROR: (RED, "Error", RESET),
+        logging.WARNING: (YELLOW, "Warn", RESET),
+        logging.INFO: (CYAN, "Info", RESET),
+        logging.DEBUG: ("", "Log", ""),
+    }
+
     def __init__(self) -> None:
+        super().__init__(datefmt="%Y-%m-%d %H:%M:%S")
+        # the time is shown in whole seconds, so it is formatted once per second
+        self.last_second = None
+        self.last_time_text = ""
+        return None
+
+    def formatTime(self, record: logging.LogRecord, datefmt=None) -> str:
+        second = int(record.created)
+        if second != self.last_second:
+            self.last_time_text = super().formatTime(record, datefmt)
+            self.last_second = second
+        return self.last_time_text
+
+    def format(self, record: logging.LogRecord) -> str:
+        prefix, label, suffix = self.LEVEL_STYLES[record.levelno]
+        return f"{prefix}[{self.formatTime(record, self.datefmt)}] [{label}]\t{record.getMessage()}{suffix}"
+
+
+# This class is used to log messages with different levels of severity.
+class Logger:
+
+    __slots__ = ("logger",)
+
+    def __init__(self) -> None:
+        # all loggers share one stdout handler, installed by the first logger
+        self.logger = logging.getLogger("usvideo_capture")
+        if not self.logger.handlers:
+            handler = logging.StreamHandler(sys.stdout)
+            handler.setFormatter(ColorFormatter())
+            self.logger.addHandler(handler)
+            self.logger.setLevel(logging.DEBUG)
+            self.logger.propagate = False
         return None
 
     def error(self, message: str) -> None:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"{self.RED}[{current_time}] [Error]\t{message}{self.RESET}")
+        self.logger.error(message)
         return None
 
     def warn(self, message: str) -> None:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"{self.YELLOW}[{current_time}] [Warn]\t{message}{self.RESET}")
+        self.logger.warning(message)
         return None
 
     def info(self, message: str) -> None:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"{self.CYAN}[{current_time}] [Info]\t{message}{self.RESET}")
+        self.logger.info(message)
         return None
 
     def log(self, message: str) -> None:
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{current_time}] [Log]\t{message}")
+        self.logger.debug(message)
         return None
 
 
@@ -89,8 +138,9 @@ class ParameterParser:
             "source": "recordings/bk5000.mp4",
             "width": 1024,
             "height": 768,
+            "buffer_size": 1,
         },
-        "video_recording": {"directory": "recordings", "fps": 60},
+        "video_recording": {"directory": "recordings", "fps": 60, "codec": "mp4v"},
         "udp_communication": {
             "sender_ip": "127.0.0.1",
             "sender_port": 60511,
@@ -100,6 +150,21 @@ class ParameterParser:
         },
     }
 
+    # (category, parameter, default value) for each parameter of default_config
+    default_parameters = tuple(
+        (category, parameter, value)
+        for category, parameters in default_config.items()
+        for parameter, value in parameters.items()
+    )
+
+    __slots__ = ("logger", "config")
+
+    # characters that are not allowed in directory paths
+    INVALID_PATH_CHARS = frozenset('<>:"|?*')
+
+    # parsed YAML files keyed by (absolute path, modification time, size)
+    yaml_cache = {}
+
     def __init__(self) -> None:
         self.logger = Logger()
         self.config = {}
@@ -109,15 +174,13 @@ class ParameterParser:
         self.config = self.__load_yaml(file_path)
 
         # Use default values if not specified in the YAML file
-        for category, parameters in self.default_config.items():
-            if category not in self.config:
-                self.config[category] = {}
-            for parameter, value in parameters.items():
-                if self.config[category].get(parameter) is None:
-                    self.config[category][parameter] = value
-                    self.logger.warn(
-                        f"Parameter [{category}][{parameter}] not found. Using default value: {value}"
-                    )
+        for category, parameter, value in self.default_parameters:
+            parameters = self.config.setdefault(category, {})
+            if parameters.get(parameter) is None:
+                parameters[parameter] = value
+                self.logger.warn(
+                    f"Parameter [{category}][{parameter}] not found. Using default value: {value}"
+                )
 
         if self.__validate_parameters():
             self.logger.log(
@@ -149,16 +212,24 @@ class ParameterParser:
             )
             return {}
         try:
-            with open(file_path, "r") as file:
-                self.logger.log(f"Configuration loaded successfully.")
-                config = yaml.safe_load(file)
-                if config is None:
-                    self.logger.warn(
-                        f"The file '{file_path}' is empty. Using default configuration."
-                    )
-                    return {}
-                else:
-                    return config
+            # reuse the parsed file as long as it is not modified
+            stat = os.stat(file_path)
+            cache_key = (os.path.abspath(file_path), stat.st_mtime_ns, stat.st_size)
+            if cache_key in self.yaml_cache:
+                self.logger.log("Configuration loaded successfully (cached).")
+                config = copy.deepcopy(self.yaml_cache[cache_key])
+            else:
+                with open(file_path, "r") as file:
+                    self.logger.log(f"Configuration loaded successfully.")
+                    config = yaml.load(file, Loader=YamlLoader)
+                self.yaml_cache[cache_key] = copy.deepcopy(config)
+            if config is None:
+                self.logger.warn(
+                    f"The file '{file_path}' is empty. Using default configuration."
+                )
+                return {}
+            else:
+                return config
         except FileNotFoundError:
             self.logger.error(
                 f"The file '{file_path}' does not exist. Using default configuration."
@@ -179,17 +250,12 @@ class ParameterParser:
         bool: True if all parameters are valid, false otherwise.
         """
         self.logger.info("Validating parameters in the configuration...")
-        is_valid = True
-        is_valid &= self.__is_parameter_int_or_str("video_capture", "source")
-        is_valid &= self.__is_parameter_int("video_capture", "width")
-        is_valid &= self.__is_parameter_int("video_capture", "height")
-        is_valid &= self.__is_parameter_directory("video_recording", "directory")
-        is_valid &= self.__is_parameter_int("video_recording", "fps")
-        is_valid &= self.__is_parameter_ip("udp_communication", "sender_ip")
-        is_valid &= self.__is_parameter_port("udp_communication", "sender_port")
-        is_valid &= self.__is_parameter_ip("udp_communication", "receiver_ip")
-        is_valid &= self.__is_parameter_port("udp_communication", "receiver_port")
-        is_valid &= self.__is_parameter_format("udp_communication", "format")
+        # every parameter is checked, so that all invalid parameters are reported at once
+        results = [
+            validator(self, category, parameter)
+            for category, parameter, validator in self.parameter_validators
+        ]
+        is_valid = all(results)
         if is_valid:
             self.logger.log("All parameters are valid.")
         else:
@@ -226,7 +292,7 @@ class ParameterParser:
         bool: True if the parameter is an integer, false otherwise.
         """
         value = self.config[category][parameter]
-        flag = isinstance(value, (int, str))
+        flag = isinstance(value, int) and not isinstance(value, bool)
         if not flag:
             self.logger.error(
                 f"Parameter [{category}][{parameter}] is invalid! It should be an integer. "
@@ -247,7 +313,7 @@ class ParameterParser:
         value = self.config[category][parameter]
         flag = True
         # Check for invalid characters
-        if any(char in value for char in r'<>:"|?*'):
+        if not self.INVALID_PATH_CHARS.isdisjoint(value):
             flag = False
         # Check if the path is valid
         if not os.path.isabs(value) and not os.path.normpath(value):
@@ -261,6 +327,25 @@ class ParameterParser:
             self.logger.log(f"Parameter [{category}][{parameter}] is valid: {value}")
         return flag
 
+    def __is_parameter_fourcc(self, category: str, parameter: str) -> bool:
+        """
+        Check if `self.config[category][parameter]` is a string representing a four character video codec code.
+        This private method should not be called externally.
+
+        Returns:
+        bool: True if the parameter is a valid codec code, false otherwise.
+        """
+        value = self.config[category][parameter]
+        flag = isinstance(value, str) and len(value) == 4
+        if not flag:
+            self.logger.error(
+                f"Parameter [{category}][{parameter}] is invalid! It should be a four character codec code (e.g. mp4v, avc1). "
+                f"Current value: {value} (type: {type(value).__name__})"
+            )
+        else:
+            self.logger.log(f"Parameter [{category}][{parameter}] is valid: {value}")
+        return flag
+
     def __is_parameter_ip(self, category: str, parameter: str) -> bool:
         """
         Check if `self.config[category][parameter]` is a string representing a valid IPV4 IP.
@@ -335,6 +420,22 @@ class ParameterParser:
                 self.logger.info(f"\t{parameter}: {value}")
         return None
 
+    # (category, parameter, validator) for each parameter, checked in this order
+    parameter_validators = (
+        ("video_capture", "source", __is_parameter_int_or_str),
+        ("video_capture", "width", __is_parameter_int),
+        ("video_capture", "height", __is_parameter_int),
+        ("video_capture", "buffer_size", __is_parameter_int),
+        ("video_recording", "directory", __is_parameter_directory),
+        ("video_recording", "fps", __is_parameter_int),
+        ("video_recording", "codec", __is_parameter_fourcc),
+        ("udp_communication", "sender_ip", __is_parameter_ip),
+        ("udp_communication", "sender_port", __is_parameter_port),
+        ("udp_communication", "receiver_ip", __is_parameter_ip),
+        ("udp_communication", "receiver_port", __is_parameter_port),
+        ("udp_communication", "format", __is_parameter_format),
+    )
+
 
 # This class is used to capture video frames from a source and process them.
 class VideoCapturer:
@@ -356,6 +457,76 @@ class VideoCapturer:
     TOP_DOWN = 1
     BOTTOM_UP = -1
 
+    # Key constants (lowercase and uppercase key codes)
+    KEY_RECORDING = (ord("r"), ord("R"))
+    KEY_CALIBRATION = (ord("c"), ord("C"))
+    KEY_TARGETING = (ord("t"), ord("T"))
+    KEY_SEND_TARGETS = (ord("s"), ord("S"))
+    KEY_ANNOTATIONS = (ord("h"), ord("H"))
+    KEY_QUIT = (ord("q"), ord("Q"))
+
+    # Window radii of the nearest white pixel search, from the first try to the widest window
+    WHITE_PIXEL_SEARCH_RADII = (8, 50)
+
+    # Largest UDP payload in bytes, leaves room for the IP and UDP headers within a 1500 byte MTU
+    UDP_MAX_PAYLOAD_SIZE = 1400
+
+    # Instance attributes (no per-instance __dict__, faster attribute access in the capture loop)
+    __slots__ = (
+        "logger",
+        "video_capture_source",
+        "video_capture_width",
+        "video_capture_height",
+        "video_capture_buffer_size",
+        "video_recording_directory",
+        "video_recording_fps",
+        "video_recording_codec",
+        "udp_sender_ip",
+        "udp_sender_port",
+        "udp_receiver_ip",
+        "udp_receiver_port",
+        "udp_format",
+        "using_video_file",
+        "video_capture",
+        "video_playback_fps",
+        "frame",
+        "playback_start_time",
+        "playback_frame_index",
+        "next_frame_deadline",
+        "frame_needs_resize",
+        "frame_resize_interpolation",
+        "frame_buffer",
+        "frame_ready",
+        "frame_reader",
+        "is_frame_reader_running",
+        "is_video_recording",
+        "video_writer",
+        "video_writer_queue",
+        "video_writer_thread",
+        "video_writer_dropped_frames",
+        "is_calibrated",
+        "points_for_calibration",
+        "pixel_to_mm_ratio",
+        "frame_origin",
+        "image_direction",
+        "targets",
+        "udp_socket",
+        "is_udp_socket_connected",
+        "udp_packer",
+        "udp_targets_per_packet",
+        "udp_sent_targets",
+        "state",
+        "hide_annotations",
+        "help_bar_sprite",
+        "calibration_help_sprite",
+        "targeting_help_sprite",
+        "calibration_incomplete_sprite",
+        "calibration_label_sprite",
+        "origin_marker_sprite",
+        "mouse_position",
+        "point_cache",
+    )
+
     def __init__(self, config: dict) -> None:
         self.logger = Logger()
 
@@ -365,8 +536,10 @@ class VideoCapturer:
         self.video_capture_source = config["video_capture"]["source"]
         self.video_capture_width = config["video_capture"]["width"]
         self.video_capture_height = config["video_capture"]["height"]
+        self.video_capture_buffer_size = config["video_capture"]["buffer_size"]
         self.video_recording_directory = config["video_recording"]["directory"]
         self.video_recording_fps = config["video_recording"]["fps"]
+        self.video_recording_codec = config["video_recording"]["codec"]
         self.udp_sender_ip = config["udp_communication"]["sender_ip"]
         self.udp_sender_port = config["udp_communication"]["sender_port"]
         self.udp_receiver_ip = config["udp_communication"]["receiver_ip"]
@@ -374,13 +547,25 @@ class VideoCapturer:
         self.udp_format = config["udp_communication"]["format"]
 
         # instance variables for video capturing
-        self.using_video_file = (
-            True if type(self.video_capture_source) is str else False
-        )
+        self.using_video_file = isinstance(self.video_capture_source, str)
         if self.using_video_file:
-            self.video_capture = cv2.VideoCapture(self.video_capture_source)
-            self.video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.video_capture_width)
-            self.video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.video_capture_height)
+            # prefer hardware accelerated decoding, fall back to software decoding
+            try:
+                self.video_capture = cv2.VideoCapture(
+                    self.video_capture_source,
+                    cv2.CAP_FFMPEG,
+                    [cv2.CAP_PROP_HW_ACCELERATION, cv2.VIDEO_ACCELERATION_ANY],
+                )
+            except cv2.error:
+                self.video_capture = cv2.VideoCapture()
+            if not self.video_capture.isOpened():
+                self.video_capture = cv2.VideoCapture(self.video_capture_source)
+            elif (
+                self.video_capture.get(cv2.CAP_PROP_HW_ACCELERATION)
+                != cv2.VIDEO_ACCELERATION_NONE
+            ):
+                self.logger.log("Hardware accelerated decoding enabled.")
+            # the decoded frames are resized in the capture loop, a video file has no size to set
             self.video_playback_fps = self.video_capture.get(cv2.CAP_PROP_FPS)
             self.logger.info(f"Opening video file {self.video_capture_source}...")
         else:
@@ -398,12 +583,32 @@ class VideoCapturer:
                 raise NotImplementedError("Unsupported platform.")
             self.video_capture.set(cv2.CAP_PROP_FRAME_WIDTH, self.video_capture_width)
             self.video_capture.set(cv2.CAP_PROP_FRAME_HEIGHT, self.video_capture_height)
+            # a small driver buffer keeps the frames fresh, stale frames add latency
+            self.video_capture.set(
+                cv2.CAP_PROP_BUFFERSIZE, self.video_capture_buffer_size
+            )
             self.logger.info(f"Opening camera {self.video_capture_source}...")
         self.frame = None
+        # playback clock of video file replay, restarted when the file restarts
+        self.playback_start_time = None
+        self.playback_frame_index = 0
+        self.next_frame_deadline = None
+        # the source delivers frames of a fixed size, so the resize is planned on the first frame
+        self.frame_needs_resize = False
+        self.frame_resize_interpolation = None
+
+        # instance variables for the background frame reader (live capture only)
+        self.frame_buffer = deque(maxlen=1)  # only the latest frame is kept
+        self.frame_ready = threading.Event()
+        self.frame_reader = None
+        self.is_frame_reader_running = False
 
         # instance variables for video recording
         self.is_video_recording = False
         self.video_writer = None
+        self.video_writer_queue = queue.Queue(maxsize=8)
+        self.video_writer_thread = None
+        self.video_writer_dropped_frames = 0
 
         # instance variables for calibration
         self.is_calibrated = False
@@ -420,7 +625,32 @@ class VideoCapturer:
 
         # variables for UDP communication
         self.udp_socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+        # a larger send buffer absorbs bursts of targets
+        self.udp_socket.setsockopt(socket.SOL_SOCKET, socket.SO_SNDBUF, 1 << 20)
+        # do not fragment packets, oversized packets are reported when sending instead
+        if hasattr(socket, "IP_MTU_DISCOVER"):
+            self.udp_socket.setsockopt(
+                socket.IPPROTO_IP, socket.IP_MTU_DISCOVER, socket.IP_PMTUDISC_DO
+            )
+        # sending targets should never block the video capture
+        self.udp_socket.setblocking(False)
         self.udp_socket.bind((self.udp_sender_ip, self.udp_sender_port))
+        # all packets go to the same receiver, so the destination is set once
+        # if the receiver is not reachable from the sender address, fall back to sendto() per packet
+        try:
+            self.udp_socket.connect((self.udp_receiver_ip, self.udp_receiver_port))
+            self.is_udp_socket_connected = True
+        except OSError as exc:
+            self.is_udp_socket_connected = False
+            self.logger.error(
+                f"Failed to connect the UDP socket to {self.udp_receiver_ip}:{self.udp_receiver_port}. "
+                f"Sending targets may fail. Details: {exc}"
+            )
+        self.udp_packer = struct.Struct(self.udp_format)  # compiled once for all sends
+        # keep packets below a typical Ethernet MTU, so they are neither fragmented nor rejected
+        self.udp_targets_per_packet = max(
+            1, self.UDP_MAX_PAYLOAD_SIZE // max(1, self.udp_packer.size)
+        )
         self.udp_sent_targets = []  # list of targets sent to the receiver
 
         # instance variables for state transitions
@@ -428,6 +658,19 @@ class VideoCapturer:
 
         # instance variables for annotations
         self.hide_annotations = False
+        # static annotations are rendered once and pasted onto every frame
+        self.help_bar_sprite = self.__create_sprite(self.__draw_help_bar)
+        self.calibration_help_sprite = self.__create_sprite(
+            self.__draw_calibration_help
+        )
+        self.targeting_help_sprite = self.__create_sprite(self.__draw_targeting_help)
+        self.calibration_incomplete_sprite = self.__create_sprite(
+            self.__draw_calibration_incomplete
+        )
+        # (text, sprite) of the pixel to mm ratio label, re-rendered when the text changes
+        self.calibration_label_sprite = (None, None)
+        # (origin, sprite) of the frame origin marker, re-rendered when the origin changes
+        self.origin_marker_sprite = (None, None)
 
         # instance variables for mouse events
         self.mouse_position = None
@@ -460,6 +703,9 @@ class VideoCapturer:
         self.logger.info(
             "Press 'r' to start/stop recording, 'c' to toggle calibration mode, 't' to toggle targeting mode"
         )
+        self.logger.info(
+            "Press 's' to send all selected targets at once (only available in targeting mode)"
+        )
         self.logger.info(
             "Press 'h' to hide/show annotations (not available in calibration and targeting modes)"
         )
@@ -469,53 +715,172 @@ class VideoCapturer:
         )
         self.logger.log("=================================================")
 
+        # read camera frames in the background so that drawing never delays the next read
+        if not self.using_video_file:
+            self.is_frame_reader_running = True
+            self.frame_reader = threading.Thread(
+                target=self.__frame_reader_loop, daemon=True
+            )
+            self.frame_reader.start()
+
+        # values that do not change while capturing, kept in locals for the loop
+        using_video_file = self.using_video_file
+        frame_size = (self.video_capture_width, self.video_capture_height)
         while True:
-            ret, self.frame = self.video_capture.read()
+            ret, self.frame = self.__read_frame()
             if not ret:
-                if self.using_video_file:
+                if using_video_file:
                     self.logger.log("End of video file. Restarting...")
                     self.video_capture.set(cv2.CAP_PROP_POS_FRAMES, 0)
+                    self.playback_start_time = None
+                    self.next_frame_deadline = None
                     continue
                 self.logger.error("Failed to capture frame.")
                 break
 
             # Resize the frame if necessary
-            if (
-                self.frame.shape[1] != self.video_capture_width
-                or self.frame.shape[0] != self.video_capture_height
-            ):
+            if self.frame_resize_interpolation is None:
+                self.__plan_frame_resize()
+            if self.frame_needs_resize:
                 self.frame = cv2.resize(
-                    self.frame, (self.video_capture_width, self.video_capture_height)
+                    self.frame,
+                    frame_size,
+                    interpolation=self.frame_resize_interpolation,
                 )
 
             self.__draw_annotations()
             if self.is_video_recording and self.video_writer is not None:
-                self.video_writer.write(self.frame)
+                # encode a copy in the writer thread, the frame is still drawn on below
+                self.__enqueue_recording_frame(self.frame.copy())
                 # draw a red circle to indicate recording (this is not saved in the video)
                 cv2.circle(
                     self.frame, (self.video_capture_width - 30, 30), 10, self.RED, -1
                 )
             cv2.imshow("Live Ultrasound Video Capture", self.frame)
 
-            if self.using_video_file:
-                key = (
-                    cv2.waitKey(int(1000 / self.video_playback_fps)) & 0xFF
-                )  # match video playback speed
+            if using_video_file:
+                key = cv2.waitKey(self.__playback_wait_time()) & 0xFF
             else:
-                key = cv2.waitKey(1) & 0xFF
+                # the frame reader already paces the loop, so do not sleep waiting for a key
+                key = cv2.pollKey() & 0xFF
             if self.__handle_key(key):
                 pass
             else:
                 break
 
         # Release everything if job is finished
+        self.is_frame_reader_running = False
+        if self.frame_reader is not None:
+            self.frame_reader.join()
         self.video_capture.release()
-        if self.video_writer:
-            self.video_writer.release()
+        if self.is_video_recording:
+            self.__stop_recording()
         cv2.destroyAllWindows()
         self.udp_socket.close()
         return None
 
+    def __plan_frame_resize(self) -> None:
+        """
+        Decide from the current frame whether frames of the source need to be resized to the configured size,
+        and which interpolation to use.
+        This private method should not be called externally.
+        """
+        frame_height, frame_width = self.frame.shape[:2]
+        self.frame_needs_resize = (
+            frame_width != self.video_capture_width
+            or frame_height != self.video_capture_height
+        )
+        # area averaging when shrinking, so that a lower working resolution stays sharp
+        if (
+            frame_width > self.video_capture_width
+            and frame_height > self.video_capture_height
+        ):
+            self.frame_resize_interpolation = cv2.INTER_AREA
+        else:
+            self.frame_resize_interpolation = cv2.INTER_LINEAR
+        if self.frame_needs_resize:
+            self.logger.log(
+                f"Frames of {frame_width}x{frame_height} will be resized to {self.video_capture_width}x{self.video_capture_height}."
+            )
+        return None
+
+    def __read_frame(self) -> tuple:
+        """
+        Read the next frame from the video source.
+        When replaying a video file, a playback clock (start time and number of frames read) tells which frame is due.
+        If the loop falls behind, the frames that are already overdue are skipped with grab(),
+        which still decodes them (FFmpeg has to, to advance), but skips the BGR conversion and copy of retrieve().
+        When capturing from a camera, the latest frame of the background frame reader is returned.
+        This private method should not be called externally.
+
+        Returns:
+        tuple: (ret, frame) as returned by cv2.VideoCapture.read().
+        """
+        if self.using_video_file:
+            current_time = time.perf_counter()
+            if self.playback_start_time is None:
+                self.playback_start_time = current_time
+                self.playback_frame_index = 0
+            # index of the frame that is due now on the playback clock
+            due_frame_index = int(
+                (current_time - self.playback_start_time) * self.video_playback_fps
+            )
+            while self.playback_frame_index < due_frame_index:
+                if not self.video_capture.grab():
+                    return False, None
+                self.playback_frame_index += 1
+            if not self.video_capture.grab():
+                return False, None
+            self.playback_frame_index += 1
+            return self.video_capture.retrieve()
+
+        # live capture: take the latest frame from the background reader
+        while not self.frame_buffer:
+            if not self.is_frame_reader_running:
+                return False, None
+            self.frame_ready.wait()
+            self.frame_ready.clear()
+        return True, self.frame_buffer.popleft()
+
+    def __playback_wait_time(self) -> int:
+        """
+        Compute how long to wait for a key press so that the next frame is shown on time when replaying a video file.
+        `next_frame_deadline` is the time at which the wait ends and the next frame is read, it advances by one frame interval
+        per frame, so the time spent on reading and drawing the current frame is subtracted from the wait.
+        On the first frame, after the file restarts, or if the loop falls more than one frame interval behind, the schedule
+        restarts one frame interval from now instead of trying to catch up (the overdue frames are skipped by `__read_frame`).
+        This private method should not be called externally.
+
+        Returns:
+        int: The time to wait in milliseconds (at least 1 ms).
+        """
+        current_time = time.perf_counter()
+        frame_interval = 1 / self.video_playback_fps
+        if (
+            self.next_frame_deadline is None
+            or current_time - self.next_frame_deadline > frame_interval
+        ):
+            self.next_frame_deadline = current_time + frame_interval
+        else:
+            self.next_frame_deadline += frame_interval
+        wait_time = self.next_frame_deadline - current_time
+        return max(1, round(wait_time * 1000))
+
+    def __frame_reader_loop(self) -> None:
+        """
+        Continuously read camera frames into the single-slot frame buffer, dropping stale frames.
+        This private method runs in the background frame reader thread and should not be called externally.
+        """
+        while self.is_frame_reader_running:
+            ret, frame = self.video_capture.read()
+            if not ret:
+                break
+            self.frame_buffer.append(frame)
+            self.frame_ready.set()
+        self.is_frame_reader_running = False
+        self.frame_ready.set()
+        return None
+
     def __mouse_callback(self, event, x, y, flags, param) -> None:
         """
         Handle mouse events.
@@ -637,8 +1002,8 @@ class VideoCapturer:
                     self.logger.warn("No targets to send.")
                     return None
                 target_to_send = self.__find_closest_target(self.mouse_position)
-                self.__udp_send_target(target_to_send)
-                self.targets.remove(target_to_send)
+                if self.__udp_send_targets([target_to_send]):
+                    self.targets.remove(target_to_send)
 
         # no mouse events available in normal mode
         else:
@@ -656,9 +1021,8 @@ class VideoCapturer:
         should_continue = True
 
         # toggle recording
-        if key == ord("r") or key == ord("R"):
+        if key in self.KEY_RECORDING:
             if not self.is_video_recording:
-                self.is_video_recording = True
                 start_time = datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
                 if not os.path.exists(self.video_recording_directory):
                     os.makedirs(self.video_recording_directory)
@@ -670,19 +1034,29 @@ class VideoCapturer:
                 )
                 self.video_writer = cv2.VideoWriter(
                     file_name,
-                    cv2.VideoWriter_fourcc(*"mp4v"),
+                    cv2.VideoWriter_fourcc(*self.video_recording_codec),
                     self.video_recording_fps,
                     (self.video_capture_width, self.video_capture_height),
                 )
-                self.logger.info(f"Recording started. Saving to {file_name}")
+                if not self.video_writer.isOpened():
+                    self.logger.error(
+                        f"Failed to open a video writer for {file_name} with codec '{self.video_recording_codec}'. Recording not started."
+                    )
+                    self.video_writer.release()
+                    self.video_writer = None
+                else:
+                    self.is_video_recording = True
+                    self.video_writer_dropped_frames = 0
+                    self.video_writer_thread = threading.Thread(
+                        target=self.__video_writer_loop, daemon=True
+                    )
+                    self.video_writer_thread.start()
+                    self.logger.info(f"Recording started. Saving to {file_name}")
             else:
-                self.is_video_recording = False
-                self.video_writer.release()
-                self.video_writer = None
-                self.logger.info("Recording stopped.")
+                self.__stop_recording()
 
         # toggle calibration mode
-        elif key == ord("c") or key == ord("C"):
+        elif key in self.KEY_CALIBRATION:
             if self.state == self.NORMAL:
                 self.state = self.CALIBRATION
                 self.logger.info("Entering calibration mode...")
@@ -693,7 +1067,7 @@ class VideoCapturer:
                 self.logger.warn("Cannot enter calibration mode in targeting mode")
 
         # toggle targeting mode
-        elif key == ord("t") or key == ord("T"):
+        elif key in self.KEY_TARGETING:
             if self.is_calibrated:
                 if self.state == self.NORMAL:
                     self.state = self.TARGETING
@@ -710,8 +1084,20 @@ class VideoCapturer:
             else:
                 self.logger.warn("Cannot enter targeting mode without calibration")
 
+        # send all selected targets at once
+        elif key in self.KEY_SEND_TARGETS:
+            if self.state == self.TARGETING:
+                if self.targets:
+                    # targets in packets that could not be sent stay selected
+                    sent_count = self.__udp_send_targets(self.targets)
+                    self.targets = self.targets[sent_count:]
+                else:
+                    self.logger.warn("No targets to send.")
+            else:
+                self.logger.warn("Cannot send targets outside targeting mode")
+
         # hide/show annotations
-        elif key == ord("h") or key == ord("H"):
+        elif key in self.KEY_ANNOTATIONS:
             if self.state == self.NORMAL:
                 # if self.is_calibrated:
                 self.hide_annotations = not self.hide_annotations
@@ -727,7 +1113,7 @@ class VideoCapturer:
                 )
 
         # quit
-        elif key == ord("q") or key == ord("Q"):
+        elif key in self.KEY_QUIT:
             should_continue = False
             self.logger.info("Quitting...")
 
@@ -736,33 +1122,61 @@ class VideoCapturer:
             pass
         return should_continue
 
-    def __draw_annotations(self) -> None:
+    def __enqueue_recording_frame(self, frame) -> None:
         """
-        Draw annotations on the frame according to the current state.
-        This private method should not be called externally
+        Hand a frame over to the video writer thread.
+        If the writer falls behind, the oldest queued frame is dropped to keep the capture real-time.
+        This private method should not be called externally.
         """
+        try:
+            self.video_writer_queue.put_nowait(frame)
+        except queue.Full:
+            try:
+                self.video_writer_queue.get_nowait()
+                self.video_writer_dropped_frames += 1
+            except queue.Empty:
+                pass
+            self.video_writer_queue.put_nowait(frame)
+        return None
 
-        if not self.hide_annotations:
+    def __video_writer_loop(self) -> None:
+        """
+        Encode queued frames until the stop signal (None) is received.
+        This private method runs in the video writer thread and should not be called externally.
+        """
+        while True:
+            frame = self.video_writer_queue.get()
+            if frame is None:
+                break
+            self.video_writer.write(frame)
+        return None
 
-            cv2.rectangle(
-                self.frame,
-                (10, self.video_capture_height - 60),
-                (self.video_capture_width - 10, self.video_capture_height - 20),
-                self.BLACK,
-                -1,
+    def __stop_recording(self) -> None:
+        """
+        Stop recording after all queued frames have been written, then release the video writer.
+        This private method should not be called externally.
+        """
+        self.is_video_recording = False
+        self.video_writer_queue.put(None)
+        self.video_writer_thread.join()
+        self.video_writer_thread = None
+        self.video_writer.release()
+        self.video_writer = None
+        if self.video_writer_dropped_frames:
+            self.logger.warn(
+                f"{self.video_writer_dropped_frames} frames were dropped because the video writer fell behind."
             )
+        self.logger.info("Recording stopped.")
+        return None
 
-            cv2.putText(
-                self.frame,
-                "[R] start/stop recording    [C] toggle calibration    [T] toggle target selection",
-                (10, self.video_capture_height - 40),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.WHITE,
-                1,
-            )
+    def __draw_annotations(self) -> None:
+        """
+        Draw annotations on the frame according to the current state.
+        This private method should not be called externally
+        """
 
-            pass
+        if not self.hide_annotations:
+            self.__paste_sprite(self.help_bar_sprite)
 
         if self.is_calibrated and not self.hide_annotations:
             x1, y1 = self.points_for_calibration[0]
@@ -770,92 +1184,28 @@ class VideoCapturer:
             cv2.line(self.frame, (x1, y1), (x1, y2), self.YELLOW, 2)
             cv2.circle(self.frame, (x1, y1), 5, self.YELLOW, -1)
             cv2.circle(self.frame, (x1, y2), 5, self.YELLOW, -1)
-            cv2.rectangle(
-                self.frame,
-                (self.video_capture_width - 200, 30),
-                (self.video_capture_width - 30, 60),
-                self.BLACK,
-                -1,
-            )
-            cv2.putText(
-                self.frame,
-                f"10mm = {np.abs(y2 - y1)} pixels",
-                (self.video_capture_width - 200, 50),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.YELLOW,
-                1,
-            )
-            cv2.circle(self.frame, self.frame_origin, 5, self.YELLOW, -1)
-            cv2.putText(
-                self.frame,
-                f"Origin",
-                (self.frame_origin[0] + 10, self.frame_origin[1] - 10),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.YELLOW,
-                1,
-            )
+            # the label only changes with the calibration, so it is rendered once per text
+            label = f"10mm = {np.abs(y2 - y1)} pixels"
+            if self.calibration_label_sprite[0] != label:
+                self.calibration_label_sprite = (
+                    label,
+                    self.__create_sprite(
+                        lambda canvas: self.__draw_calibration_label(canvas, label)
+                    ),
+                )
+            self.__paste_sprite(self.calibration_label_sprite[1])
+            self.__paste_origin_marker()
 
         if self.state == self.CALIBRATION:
-            cv2.rectangle(self.frame, (5, 10), (700, 100), self.BLACK, -1)
-            cv2.putText(
-                self.frame,
-                "Calibration mode: please select frame origin first and then two points for calibration",
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.GREEN,
-                1,
-            )
-            cv2.putText(
-                self.frame,
-                "Right click: select frame origin",
-                (10, 50),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.GREEN,
-                1,
-            )
-            cv2.putText(
-                self.frame,
-                "Left click: select calibration points. Please mark 10mm depth on the image",
-                (10, 70),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.GREEN,
-                1,
-            )
+            self.__paste_sprite(self.calibration_help_sprite)
             if not self.is_calibrated:
-                cv2.circle(self.frame, self.frame_origin, 5, self.YELLOW, -1)
-                cv2.putText(
-                    self.frame,
-                    f"Origin",
-                    (self.frame_origin[0] + 10, self.frame_origin[1] - 10),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    self.YELLOW,
-                    1,
-                )
-                cv2.putText(
-                    self.frame,
-                    f"Calibration not completed",
-                    (10, 90),
-                    cv2.FONT_HERSHEY_SIMPLEX,
-                    0.5,
-                    self.YELLOW,
-                    1,
-                )
+                self.__paste_origin_marker()
+                self.__paste_sprite(self.calibration_incomplete_sprite)
                 for point in self.points_for_calibration:
                     cv2.circle(self.frame, point, 5, self.RED, -1)
             if self.mouse_position:
                 x, y = self.mouse_position
-                cv2.line(
-                    self.frame, (x, 0), (x, self.video_capture_height), self.GREEN, 1
-                )
-                cv2.line(
-                    self.frame, (0, y), (self.video_capture_width, y), self.GREEN, 1
-                )
+                self.__draw_crosshair(x, y, self.GREEN)
                 cv2.putText(
                     self.frame,
                     f"({x}, {y})",
@@ -867,42 +1217,10 @@ class VideoCapturer:
                 )
 
         if self.state == self.TARGETING:
-            cv2.rectangle(self.frame, (5, 10), (630, 80), self.BLACK, -1)
-            cv2.putText(
-                self.frame,
-                "Targeting mode: please select targets",
-                (10, 30),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.CYAN,
-                1,
-            )
-            cv2.putText(
-                self.frame,
-                "Left click to select a target, right click to remove a target",
-                (10, 50),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.CYAN,
-                1,
-            )
-            cv2.putText(
-                self.frame,
-                "Middle click (or ctrl + left click) to send a selected target to the receiver",
-                (10, 70),
-                cv2.FONT_HERSHEY_SIMPLEX,
-                0.5,
-                self.CYAN,
-                1,
-            )
+            self.__paste_sprite(self.targeting_help_sprite)
             if self.mouse_position:
                 x, y = self.mouse_position
-                cv2.line(
-                    self.frame, (x, 0), (x, self.video_capture_height), self.CYAN, 1
-                )
-                cv2.line(
-                    self.frame, (0, y), (self.video_capture_width, y), self.CYAN, 1
-                )
+                self.__draw_crosshair(x, y, self.CYAN)
                 mm_x, mm_y = self.__pixel_coordinates_to_mm_coordinates(
                     self.mouse_position
                 )
@@ -952,6 +1270,221 @@ class VideoCapturer:
 
         return None
 
+    def __draw_crosshair(self, x: int, y: int, color: tuple) -> None:
+        """
+        Draw a 1 px crosshair through (x, y) across the whole frame.
+        The lines are written directly into the frame rows and columns, which is cheaper than cv2.line.
+        Parts of the crosshair outside the frame are skipped, like cv2.line clips them.
+        This private method should not be called externally.
+        """
+        if 0 <= x < self.video_capture_width:
+            self.frame[:, x] = color
+        if 0 <= y < self.video_capture_height:
+            self.frame[y, :] = color
+        return None
+
+    def __draw_help_bar(self, canvas) -> None:
+        """
+        Draw the key bindings help bar onto a BGRA canvas.
+        This private method should not be called externally.
+        """
+        cv2.rectangle(
+            canvas,
+            (10, self.video_capture_height - 60),
+            (self.video_capture_width - 10, self.video_capture_height - 20),
+            (*self.BLACK, 255),
+            -1,
+        )
+        cv2.putText(
+            canvas,
+            "[R] start/stop recording    [C] toggle calibration    [T] toggle target selection",
+            (10, self.video_capture_height - 40),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.WHITE, 255),
+            1,
+        )
+        return None
+
+    def __paste_origin_marker(self) -> None:
+        """
+        Paste the frame origin marker onto the current frame.
+        The marker only changes with the frame origin, so it is rendered once per origin.
+        This private method should not be called externally.
+        """
+        if self.origin_marker_sprite[0] != self.frame_origin:
+            self.origin_marker_sprite = (
+                self.frame_origin,
+                self.__create_sprite(self.__draw_origin_marker),
+            )
+        self.__paste_sprite(self.origin_marker_sprite[1])
+        return None
+
+    def __draw_origin_marker(self, canvas) -> None:
+        """
+        Draw the frame origin marker onto a BGRA canvas.
+        This private method should not be called externally.
+        """
+        cv2.circle(canvas, self.frame_origin, 5, (*self.YELLOW, 255), -1)
+        cv2.putText(
+            canvas,
+            "Origin",
+            (self.frame_origin[0] + 10, self.frame_origin[1] - 10),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.YELLOW, 255),
+            1,
+        )
+        return None
+
+    def __draw_calibration_incomplete(self, canvas) -> None:
+        """
+        Draw the notice that the calibration is not completed onto a BGRA canvas.
+        This private method should not be called externally.
+        """
+        cv2.putText(
+            canvas,
+            "Calibration not completed",
+            (10, 90),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.YELLOW, 255),
+            1,
+        )
+        return None
+
+    def __draw_calibration_label(self, canvas, label: str) -> None:
+        """
+        Draw the pixel to mm ratio label onto a BGRA canvas.
+        This private method should not be called externally.
+        """
+        cv2.rectangle(
+            canvas,
+            (self.video_capture_width - 200, 30),
+            (self.video_capture_width - 30, 60),
+            (*self.BLACK, 255),
+            -1,
+        )
+        cv2.putText(
+            canvas,
+            label,
+            (self.video_capture_width - 200, 50),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.YELLOW, 255),
+            1,
+        )
+        return None
+
+    def __draw_calibration_help(self, canvas) -> None:
+        """
+        Draw the calibration mode instructions onto a BGRA canvas.
+        This private method should not be called externally.
+        """
+        cv2.rectangle(canvas, (5, 10), (700, 100), (*self.BLACK, 255), -1)
+        cv2.putText(
+            canvas,
+            "Calibration mode: please select frame origin first and then two points for calibration",
+            (10, 30),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.GREEN, 255),
+            1,
+        )
+        cv2.putText(
+            canvas,
+            "Right click: select frame origin",
+            (10, 50),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.GREEN, 255),
+            1,
+        )
+        cv2.putText(
+            canvas,
+            "Left click: select calibration points. Please mark 10mm depth on the image",
+            (10, 70),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.GREEN, 255),
+            1,
+        )
+        return None
+
+    def __draw_targeting_help(self, canvas) -> None:
+        """
+        Draw the targeting mode instructions onto a BGRA canvas.
+        This private method should not be called externally.
+        """
+        cv2.rectangle(canvas, (5, 10), (630, 100), (*self.BLACK, 255), -1)
+        cv2.putText(
+            canvas,
+            "Targeting mode: please select targets",
+            (10, 30),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.CYAN, 255),
+            1,
+        )
+        cv2.putText(
+            canvas,
+            "Left click to select a target, right click to remove a target",
+            (10, 50),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.CYAN, 255),
+            1,
+        )
+        cv2.putText(
+            canvas,
+            "Middle click (or ctrl + left click) to send a selected target to the receiver",
+            (10, 70),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.CYAN, 255),
+            1,
+        )
+        cv2.putText(
+            canvas,
+            "Press [S] to send all selected targets to the receiver at once",
+            (10, 90),
+            cv2.FONT_HERSHEY_SIMPLEX,
+            0.5,
+            (*self.CYAN, 255),
+            1,
+        )
+        return None
+
+    def __create_sprite(self, draw_function) -> tuple:
+        """
+        Render annotations once into a sprite that can be pasted onto frames.
+        `draw_function` draws onto a transparent BGRA canvas of the frame size,
+        every pixel drawn with an opaque color becomes part of the sprite.
+        This private method should not be called externally.
+
+        Returns:
+        tuple: (x, y, image, mask) of the bounding box of the drawn pixels,
+        where image holds the BGR pixels and mask marks which of them are drawn.
+        """
+        canvas = np.zeros(
+            (self.video_capture_height, self.video_capture_width, 4), np.uint8
+        )
+        draw_function(canvas)
+        x, y, w, h = cv2.boundingRect(canvas[:, :, 3].copy())
+        image = canvas[y : y + h, x : x + w, :3].copy()
+        mask = canvas[y : y + h, x : x + w, 3:] > 0
+        return (x, y, image, mask)
+
+    def __paste_sprite(self, sprite) -> None:
+        """
+        Paste a sprite created by `__create_sprite` onto the current frame.
+        This private method should not be called externally.
+        """
+        x, y, image, mask = sprite
+        h, w = mask.shape[:2]
+        np.copyto(self.frame[y : y + h, x : x + w], image, where=mask)
+        return None
+
     def __pixel_coordinates_to_mm_coordinates(self, pixel_point) -> tuple:
         """
         Convert pixel coordinates to mm coordinates using the calibration parameters.
@@ -966,54 +1499,120 @@ class VideoCapturer:
         )
         return (mm_x, mm_y)
 
+    def __pixel_points_to_mm_points(self, pixel_points) -> list:
+        """
+        Convert a list of pixel points to mm coordinates in one vectorized step.
+        This is the batch counterpart of `__pixel_coordinates_to_mm_coordinates`.
+        This private method should not be called externally.
+        """
+        scale = (self.pixel_to_mm_ratio, self.pixel_to_mm_ratio * self.image_direction)
+        mm_points = (np.asarray(pixel_points) - self.frame_origin) * scale
+        return [tuple(mm_point) for mm_point in mm_points.tolist()]
+
     def __find_nearest_white_pixel(self, pixel_point) -> tuple:
         """
         Find the nearest white pixel in the frame to the given pixel point.
         If no white pixel is found in the search radius, return the same point.
+        The search starts with a small window and only widens it if the nearest white pixel
+        could lie outside of it, so that clicks next to a white mark scan only a few pixels.
+        This private method should not be called externally.
+        """
+        nearest = None
+        for search_radius in self.WHITE_PIXEL_SEARCH_RADII:
+            nearest = self.__find_nearest_white_pixel_in_window(
+                pixel_point, search_radius
+            )
+            # any white pixel outside the window is at least search_radius away
+            if nearest is not None and nearest[1] < search_radius**2:
+                break
+        if nearest is None:
+            return pixel_point
+        return nearest[0]
+
+    def __find_nearest_white_pixel_in_window(self, pixel_point, search_radius) -> tuple:
+        """
+        Find the nearest white pixel in the window of the given radius around the given pixel point.
         This private method should not be called externally.
+
+        Returns:
+        tuple: (point, squared distance) of the nearest white pixel, or None if the window has no white pixel.
         """
-        search_radius = 50
         threshold = 225
-        min_dist = float("inf")
-        nearest_pixel = pixel_point
-        for i in range(
-            max(0, pixel_point[1] - search_radius),
-            min(self.video_capture_height, pixel_point[1] + search_radius),
-        ):
-            for j in range(
-                max(0, pixel_point[0] - search_radius),
-                min(self.video_capture_width, pixel_point[0] + search_radius),
-            ):
-                if np.all(self.frame[i, j] >= threshold):
-                    dist = (i - pixel_point[1]) ** 2 + (j - pixel_point[0]) ** 2
-                    if dist < min_dist:
-                        min_dist = dist
-                        nearest_pixel = (j, i)
-        return nearest_pixel
+        x, y = pixel_point
+        y0 = max(0, y - search_radius)
+        y1 = min(self.video_capture_height, y + search_radius)
+        x0 = max(0, x - search_radius)
+        x1 = min(self.video_capture_width, x + search_radius)
+        if y0 >= y1 or x0 >= x1:
+            return None
+        # only the white pixels in the window are considered for the distance
+        mask = cv2.inRange(
+            self.frame[y0:y1, x0:x1], (threshold,) * 3, (255,) * 3
+        )
+        white_pixels = cv2.findNonZero(mask)
+        if white_pixels is None:
+            return None
+        white_pixels = white_pixels.reshape(-1, 2) + (x0, y0)
+        dist = (white_pixels[:, 0] - x) ** 2 + (white_pixels[:, 1] - y) ** 2
+        nearest_index = dist.argmin()
+        nearest_x, nearest_y = white_pixels[nearest_index]
+        return ((int(nearest_x), int(nearest_y)), int(dist[nearest_index]))
 
     def __find_closest_target(self, pixel_point) -> tuple:
         """
         Find the closest target in self.targets to the given point (x, y).
         This private method should not be called externally.
         """
-        x, y = pixel_point
-        return min(
-            self.targets, key=lambda target: (target[0] - x) ** 2 + (target[1] - y) ** 2
-        )
+        targets = np.asarray(self.targets)
+        dist = ((targets - pixel_point) ** 2).sum(axis=1)
+        return self.targets[dist.argmin()]
 
-    def __udp_send_target(self, target_point) -> None:
+    def __udp_send_targets(self, target_points) -> int:
         """
-        Send a selected target to the receiver using UDP.
+        Send selected targets to the receiver, packing as many targets as fit into each UDP packet.
+        Each target is packed with the configured format and the packed targets are concatenated,
+        so a packet carrying one target is the same as before and the receiver can unpack any number of targets.
+        A packet carries at most `udp_targets_per_packet` targets, so that it stays below `UDP_MAX_PAYLOAD_SIZE` bytes.
+        The packets are sent in order and sending stops at the first packet that fails.
         This private method should not be called externally.
+
+        Returns:
+        int: The number of targets sent, counted from the start of `target_points`.
         """
-        mm_x, mm_y = self.__pixel_coordinates_to_mm_coordinates(target_point)
-        packet = struct.pack(self.udp_format, mm_x, mm_y)
-        self.udp_socket.sendto(packet, (self.udp_receiver_ip, self.udp_receiver_port))
-        self.udp_sent_targets.append(target_point)
-        self.logger.info(
-            f"Target (x = {mm_x} mm, y = {mm_y} mm) sent to {self.udp_receiver_ip}:{self.udp_receiver_port}"
-        )
-        return None
+        sent_count = 0
+        for start in range(0, len(target_points), self.udp_targets_per_packet):
+            packet_points = target_points[start : start + self.udp_targets_per_packet]
+            targets_mm = self.__pixel_points_to_mm_points(packet_points)
+            packet = b"".join(
+                self.udp_packer.pack(mm_x, mm_y) for mm_x, mm_y in targets_mm
+            )
+            try:
+                if self.is_udp_socket_connected:
+                    try:
+                        self.udp_socket.send(packet)
+                    except ConnectionRefusedError:
+                        # the refusal is reported one packet late: it was caused by an earlier packet
+                        # that reached no listener, and raising it clears it, so this packet is sent again
+                        self.udp_socket.send(packet)
+                else:
+                    self.udp_socket.sendto(
+                        packet, (self.udp_receiver_ip, self.udp_receiver_port)
+                    )
+            except OSError as exc:
+                # e.g. the send buffer is full or the packet exceeds the path MTU
+                self.logger.error(f"Failed to send targets. Details: {exc}")
+                break
+            self.udp_sent_targets.extend(packet_points)
+            sent_count += len(packet_points)
+            # one log line (and one timestamp) per packet, however many targets it carries
+            targets_text = ", ".join(
+                f"(x = {mm_x} mm, y = {mm_y} mm)" for mm_x, mm_y in targets_mm
+            )
+            label = "Target" if len(targets_mm) == 1 else f"{len(targets_mm)} targets"
+            self.logger.info(
+                f"{label} {targets_text} sent to {self.udp_receiver_ip}:{self.udp_receiver_port}"
+            )
+        return sent_count
 
 
 if __name__ == "__main__":
@@ -1,45 +1,59 @@
 import socket
+import select
 import threading
 import signal
 import struct
 import argparse
 import datetime
 
-running = True
+stop_event = threading.Event()
 
 def handle_client(server_socket, format):
-    while running:
-        try:
-            data, addr = server_socket.recvfrom(1024)
-            if data:
-                unpacked_data = struct.unpack(format, data)
+    packer = struct.Struct(format)  # compiled once for all packets
+    while not stop_event.is_set():
+        # wait for packets, waking up every second to check whether to stop
+        readable, _, _ = select.select([server_socket], [], [], 1.0)
+        if not readable:
+            continue
+        # drain all queued packets before waiting again and print them at once
+        now = datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+        lines = []
+        while True:
+            try:
+                data, addr = server_socket.recvfrom(65535)
+            except BlockingIOError:
+                break
+            # a packet may carry several targets packed one after another
+            for unpacked_data in packer.iter_unpack(data):
                 x = unpacked_data[0]
                 y = unpacked_data[1]
-                print(
-                    f"[{datetime.datetime.now().strftime('%Y-%m-%d %H:%M:%S')}] Received target from {addr}: (x = {x} mm, y = {y} mm)"
+                lines.append(
+                    f"[{now}] Received target from {addr}: (x = {x} mm, y = {y} mm)"
                 )
-        except socket.timeout:
-            continue
+        if lines:
+            print("\n".join(lines))
 
 def signal_handler(sig, frame):
-    global running
     print("Shutting down server...")
-    running = False
+    stop_event.set()
 
 def start_server(ip, port, format):
-    global running
     server = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    # a larger receive buffer keeps bursts of targets from being dropped
+    server.setsockopt(socket.SOL_SOCKET, socket.SO_RCVBUF, 1 << 22)
     address = (ip, port)
     server.bind(address)
-    server.settimeout(1.0)
+    server.setblocking(False)
     print(f"Server listening on {address}...")
 
     client_handler = threading.Thread(target=handle_client, args=(server, format))
     client_handler.start()
 
-    while running:
+    # sleep until Ctrl+C instead of spinning; the timeout keeps Ctrl+C responsive on Windows
+    while not stop_event.wait(timeout=1.0):
         pass
 
+    client_handler.join()
     server.close()
     print("Server shut down.")
 